@@ -39,6 +39,8 @@ from alexandria3k import debug
 
 
 RE_URL = re.compile(r"\w+://")
+RE_C_COMMENT = re.compile(r"/\*.*?\*/", re.DOTALL)
+RE_SQL_COMMENT = re.compile(r"--[^\n]*\n?")
 
 
 def is_unittest():
@@ -251,7 +253,7 @@ def remove_sqlite_comments(script):
     """
 
     # remove C-style comments
-    script = re.sub(r"/\*.*?\*/", "", script, flags=re.DOTALL)
+    script = RE_C_COMMENT.sub("", script)
 
     # remove SQL single-line comments
-    return re.sub(r"--[^\n]*\n?", "", script).strip()
+    return RE_SQL_COMMENT.sub("", script).strip()
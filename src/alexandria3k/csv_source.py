@@ -18,8 +18,8 @@
 #
 """Functions providing virtual table access to CSV data sources."""
 
-import codecs
 import csv
+import io
 
 from alexandria3k.common import data_from_uri_provider
 from alexandria3k.data_source import SINGLE_PARTITION_INDEX, StreamingTable
@@ -66,6 +66,8 @@ class CsvCursor:
         """Not part of the apsw VTCursor interface.
         The table argument is a StreamingTable object"""
         self.table = table
+        # Value extraction functions of the table's columns by ordinal
+        self.extractors = table.value_extractors
         # Initialized in Filter()
         self.eof = False
         self.item_index = -1
@@ -91,7 +93,7 @@ class CsvCursor:
         if col == 0:  # id
             return self.Rowid()
 
-        extract_function = self.table.get_value_extractor_by_ordinal(col)
+        extract_function = self.extractors[col]
         if extract_function:
             return extract_function(self.row_value)
         return self.row_value[col - 1]
@@ -103,8 +105,10 @@ class CsvCursor:
         self.eof = False
         self.item_index = -1
         self.raw_input = data_from_uri_provider(self.table.data_source)
+        # Decode through the native UTF-8 decoder on large blocks.
+        # The csv module requires its input to be opened with newline="".
         self.reader = csv.reader(
-            codecs.iterdecode(self.raw_input, "utf-8"),
+            io.TextIOWrapper(self.raw_input, encoding="utf-8", newline=""),
             delimiter=self.table.get_table_meta().delimiter,
         )
         next(self.reader, None)  # Skip header row
@@ -114,9 +118,12 @@ class CsvCursor:
         """Advance to the next item."""
         while True:  # Loop until sample returns True
             self.row_value = next(self.reader, None)
-            if not self.row_value:
+            if self.row_value is None:
                 self.eof = True
                 break
+            if not self.row_value:
+                # Skip blank lines, rather than treating them as EOF.
+                continue
             self.item_index += 1
             if not self.table.sample(self.row_value):
                 continue
@@ -70,6 +70,10 @@ class StreamingTable:
         self.table_dict = table_dict
         self.data_source = data_source
         self.sampling_function = sample
+        # Looked up by ordinal on every column access
+        self.value_extractors = [
+            column.get_value_extractor() for column in table_meta.get_columns()
+        ]
 
     def BestIndex(self, _constraints, _orderbys):
         """Called by the Engine to determine the best available index
@@ -117,7 +121,7 @@ class StreamingTable:
     def get_value_extractor_by_ordinal(self, column_ordinal):
         """Return the value extraction function for column at specified
         ordinal.  Not part of the apsw interface."""
-        return self.table_meta.get_value_extractor_by_ordinal(column_ordinal)
+        return self.value_extractors[column_ordinal]
 
 
 class StreamingCachedContainerTable(StreamingTable):
@@ -270,7 +274,10 @@ class ItemsCursor:
 
 class _IndexManager:
     """Create database indexes, avoiding duplication, and allowing
-    them to be dropped."""
+    them to be dropped.  Indexes are only created on the temporary
+    tables used for matching, after these have been filled, so that
+    no index is maintained while rows are being inserted.  The populated
+    tables have no secondary indexes."""
 
     def __init__(self, database, root_name):
         self.database = database
@@ -516,10 +523,11 @@ class DataSource:
             partition.execute(log_sql(attach_command))
 
         for i in self.data_source.get_container_iterator():
-            debug.log(
-                "progress",
-                f"Container {i} {self.data_source.get_container_name(i)}",
-            )
+            if debug.enabled("progress"):
+                debug.log(
+                    "progress",
+                    f"Container {i} {self.data_source.get_container_name(i)}",
+                )
             for table_name, table_columns in self.query_columns.items():
                 columns = ", ".join(table_columns)
                 partition.execute(
@@ -825,10 +833,16 @@ class DataSource:
             if not post_population_script:
                 return
 
-            pdb = sqlite3.connect(database_path)
+            # Run the script's statements in a single explicit
+            # transaction, whatever the module's implicit one does with
+            # the mix of DDL and DML statements.  The population data
+            # can be recreated, so there is no need to sync them.
+            pdb = sqlite3.connect(database_path, isolation_level=None)
+            pdb.execute("PRAGMA synchronous = OFF")
             script = get_string_resource(post_population_script)
             statements = remove_sqlite_comments(script).split(";\n")
 
+            pdb.execute("BEGIN")
             for statement in statements:
                 try:
                     pdb.execute(log_sql(statement))
@@ -839,7 +853,7 @@ class DataSource:
                         f"Unable to execute {statement}: {err} "
                         "(Column not populated?)"
                     )
-            pdb.commit()
+            pdb.execute("COMMIT")
             pdb.close()
 
         create_database_schema(columns)
@@ -848,24 +862,32 @@ class DataSource:
         # indexing and the file cache avoids opening, reading, decompressing,
         # and parsing each file multiple times.
         matched_tables = query_and_population_tables()
-        for i in self.data_source.get_container_iterator():
-            debug.log(
-                "progress",
-                f"Container {i} {self.data_source.get_container_name(i)}",
-            )
-
-            if len(matched_tables) == 1:
-                # False positive
-                # pylint: disable-next=unbalanced-dict-unpacking
-                (table,) = self.population_columns
-                populate_only_root_table(table, i, condition)
-            else:
-                if condition:
-                    create_matched_tables(matched_tables)
-
-                for table in self.population_columns:
-                    populate_table(table, i, condition)
-                self.index_manager.drop_indexes()
+        # Run all insertions in a single transaction, rather than in one
+        # for each statement and container, e.g. for every USPTO patent.
+        self.vdb.execute(log_sql("BEGIN"))
+        try:
+            for i in self.data_source.get_container_iterator():
+                if debug.enabled("progress"):
+                    name = self.data_source.get_container_name(i)
+                    debug.log("progress", f"Container {i} {name}")
+
+                if len(matched_tables) == 1:
+                    # False positive
+                    # pylint: disable-next=unbalanced-dict-unpacking
+                    (table,) = self.population_columns
+                    populate_only_root_table(table, i, condition)
+                else:
+                    if condition:
+                        create_matched_tables(matched_tables)
+
+                    for table in self.population_columns:
+                        populate_table(table, i, condition)
+                    self.index_manager.drop_indexes()
+        except BaseException:
+            # Leave the connection usable, e.g. after an invalid condition.
+            self.vdb.execute(log_sql("ROLLBACK"))
+            raise
+        self.vdb.execute(log_sql("COMMIT"))
         perf.log("Table population")
 
         self.vdb.execute(log_sql("DETACH populated"))
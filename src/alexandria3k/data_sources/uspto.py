@@ -31,9 +31,19 @@ from alexandria3k.data_source import (
 )
 
 from alexandria3k.common import fail
-from alexandria3k.xml import agetter, all_getter, getter, get_element
+from alexandria3k.xml import (
+    agetter,
+    all_getter,
+    elements_finder,
+    getter,
+)
 from alexandria3k.file_xml_cache import get_file_cache
-from alexandria3k.uspto_zip_cache import get_zip_cache
+from alexandria3k.uspto_zip_cache import (
+    PREFETCH_WORKERS,
+    get_zip_cache,
+    prefetching,
+    sample_all,
+)
 from alexandria3k.db_schema import ColumnMeta, TableMeta
 
 
@@ -45,7 +55,8 @@ DEFAULT_SOURCE = None
 # "ipgb" stands for "issued patent grant bibliography"
 # and it is the same for every publication file.
 # e.g. ipgb20230801.zip return 20230801.
-NAME_EXPRESSION = r"ipgb(.*?)\.zip"
+NAME_PREFIX = "ipgb"
+NAME_SUFFIX = ".zip"
 
 # Dataset Description — Patent grant full-text data (no images)
 # JAN 1976 — present Automated Patent System (APS)
@@ -54,6 +65,71 @@ NAME_EXPRESSION = r"ipgb(.*?)\.zip"
 # https://developer.uspto.gov/product/patent-grant-bibliographic-dataxml
 
 
+# Children of a patent's root element that are accessed by the tables.
+# The rest (e.g. the abstract) are dropped after parsing.
+RETAINED_ELEMENTS = frozenset(["us-bibliographic-data-grant"])
+
+# Bibliographic data elements that only the specified tables access.
+# The elements are not parsed until one of their tables is accessed.
+# In the DTD these tags only appear as children of the bibliographic
+# data; together they amount to about 90% of its size.
+OPTIONAL_ELEMENTS = {
+    "us-references-cited": {"usp_citations"},
+    "references-cited": {"usp_citations"},
+    "classifications-cpc": {"usp_cpc_classifications"},
+    "us-parties": {"usp_inventors", "usp_applicants", "usp_agents"},
+    "parties": {"usp_inventors", "usp_applicants", "usp_agents"},
+    "classifications-ipcr": {"usp_icpr_classifications"},
+    "us-field-of-classification-search": {"usp_field_of_classification"},
+    "us-related-documents": {"usp_related_documents"},
+    "assignees": {"usp_assignees"},
+}
+
+# Prefixes of the patent file names of each application type, as found
+# in the root element's file attribute, e.g. file="USPP034694-20221025.XML"
+TYPE_FILE_PREFIXES = {
+    "design": rb"USD",
+    "plant": rb"USPP",
+    "reissue": rb"USRE",
+    "utility": rb"US\d",
+}
+
+# Number of bytes at the start of a patent's XML chunk within which
+# its root start tag, following the document type declaration, ends
+ROOT_TAG_SEARCH_LENGTH = 1024
+
+# A population condition consisting only of a patent type comparison
+TYPE_CONDITION = re.compile(
+    r"\s*(?:us_patents\s*\.\s*)?type\s*=\s*'(\w+)'\s*$", re.IGNORECASE
+)
+
+
+def file_name_pattern(condition):
+    """Return a compiled regular expression matching the root start tag
+    of a patent's XML chunk, whose first group matches only if the patent
+    can satisfy the specified population condition.  Return None if the
+    condition cannot be decided from the patents' file name."""
+    if not condition:
+        return None
+    match = TYPE_CONDITION.match(condition)
+    if not match or match.group(1) not in TYPE_FILE_PREFIXES:
+        return None
+    return re.compile(
+        rb'<us-patent-grant\s[^>]*?\bfile="('
+        + TYPE_FILE_PREFIXES[match.group(1)]
+        + rb")?"
+    )
+
+
+def excluded_by_file_name(pattern, xml_chunk):
+    """Return True if the root start tag of the specified XML chunk is
+    found and its file name shows that the patent cannot satisfy the
+    condition of the specified file_name_pattern.  Patents whose root
+    start tag is not found near the chunk's start are not excluded."""
+    root = pattern.search(xml_chunk, 0, ROOT_TAG_SEARCH_LENGTH)
+    return root is not None and root.group(1) is None
+
+
 # pylint: disable=too-many-lines
 # pylint: disable=too-many-instance-attributes
 class ZipFiles:
@@ -78,13 +154,16 @@ class ZipFiles:
     def __init__(self, directory, sample_container):
         # Collect the names of all available data files
         self.file_path = []
-        self.unique_patent_xml_files = []
         self.file_directory = directory
         self.filename = None
         self.file_id = 0
         self.container_id = -1
         self.zip_path = None
         self.sample = sample_container
+        # Elements that no accessed table needs to be parsed
+        self.omitted_elements = frozenset(OPTIONAL_ELEMENTS)
+        # If set, a file_name_pattern excluding patents from iteration
+        self.container_pattern = None
 
         # Read through the directory that contains
         # the weekly patent releases of each year.
@@ -104,33 +183,58 @@ class ZipFiles:
         # Raise error if file path list is empty.
         if len(self.file_path) == 0:
             fail("No Zip files paths were detected.")
+        self.file_index = {path: i for (i, path) in enumerate(self.file_path)}
 
     def get_zip_contents(self, path):
-        """Return the a list of all the patent inside the Zip."""
+        """Return a sequence of all the patents inside the Zip."""
+        zip_cache = get_zip_cache()
+        if path != zip_cache.cached_path:
+            # Have the following Zip files extracted in the background,
+            # while this one is being processed.
+            index = self.file_index[path]
+            zip_cache.prefetch(
+                self.file_path[index + 1 : index + PREFETCH_WORKERS + 1]
+            )
         # Reading Zip file.
-        return get_zip_cache().read(path, self.sample)
+        return zip_cache.read(path, self.sample)
+
+    def access_tables(self, table_names):
+        """Have the elements required by the specified tables parsed
+        from now on.  Not part of the apsw API."""
+        self.omitted_elements = frozenset(
+            tag
+            for tag in self.omitted_elements
+            if not OPTIONAL_ELEMENTS[tag] & table_names
+        )
 
     def get_xml_chunk(self, container_id):
         """Return a XML chunk using the container_id."""
-        patent_xml = self.unique_patent_xml_files[container_id]
-
-        return patent_xml
+        return self.get_zip_contents(self.zip_path)[container_id]
 
     def zip_generator(self):
         """A generator function iterating over the Zip files and the
         containers inside."""
         # pylint: disable-next=consider-using-with
         for path in self.file_path:
-            # Access contents inside Zip for enumeration, no parsing.
-            self.unique_patent_xml_files = self.get_zip_contents(path)
+            get_zip_cache().revalidate(path)
+            # Obtain the number of containers inside Zip for enumeration.
+            # The chunks are read and parsed on demand by the cursors.
+            contents = self.get_zip_contents(path)
             self.filename = self.get_filename(path)
             self.container_id = -1
             self.zip_path = path
-            for patent in self.unique_patent_xml_files:
-                if patent is None:
-                    continue
-
-                self.container_id += 1
+            container_ids = range(len(contents))
+            if self.container_pattern:
+                # Skip, without parsing them, patents that cannot match.
+                container_ids = [
+                    i
+                    for i in container_ids
+                    if not excluded_by_file_name(
+                        self.container_pattern, contents[i]
+                    )
+                ]
+            for container_id in container_ids:
+                self.container_id = container_id
                 yield self.container_id
 
     def get_current_zip_path_by_id(self, zip_file_id):
@@ -140,11 +244,9 @@ class ZipFiles:
 
     def get_filename(self, path):
         "Return the filename of the current Zip file."
-        # Search for the pattern in the input string
-        match = re.search(NAME_EXPRESSION, path)
-
-        if match:
-            return match.group(1)
+        name = os.path.basename(path)
+        if name.startswith(NAME_PREFIX) and name.endswith(NAME_SUFFIX):
+            return name[len(NAME_PREFIX) : -len(NAME_SUFFIX)]
         return "No filename found."
 
     def get_current_zip_path(self):
@@ -172,7 +274,9 @@ class ZipFiles:
 def alternative_path_getter(path1, path2):
     """Return all elements from the specified path. If
     path1 doesn't work, use path2 as an alternative."""
-    return lambda tree: tree.findall(path1) or tree.findall(path2)
+    find1 = elements_finder(path1)
+    find2 = elements_finder(path2)
+    return lambda tree: find1(tree) or find2(tree)
 
 
 class VTSource:
@@ -227,6 +331,7 @@ class PatentsFilesCursor(ItemsCursor):
         self.zip_index = None
         self.current_file_path = None
         self.xml_contents = []
+        table.data_source.access_tables({table.get_table_meta().get_name()})
 
     def Filter(self, index_number, _index_name, constraint_args):
         """Always called first to initialize an iteration to the first
@@ -246,6 +351,7 @@ class PatentsFilesCursor(ItemsCursor):
                     self.zip_index
                 )
             )
+            get_zip_cache().revalidate(self.current_file_path)
         elif index_number & CONTAINER_INDEX:
             # Index; constraint reading through the specified container.
             self.single_file = True
@@ -264,8 +370,8 @@ class PatentsFilesCursor(ItemsCursor):
 
         self.container_id += 1
         # Zip file read.
-        self.xml_contents = get_zip_cache().read(
-            self.current_file_path, self.table.data_source.sample
+        self.xml_contents = self.table.data_source.get_zip_contents(
+            self.current_file_path
         )
 
         if self.container_id >= len(self.xml_contents):
@@ -283,8 +389,8 @@ class PatentsFilesCursor(ItemsCursor):
                         self.zip_index
                     )
                 )
-                self.xml_contents = get_zip_cache().read(
-                    self.current_file_path, self.table.data_source.sample
+                self.xml_contents = self.table.data_source.get_zip_contents(
+                    self.current_file_path
                 )
             else:
                 # Returns when all Zip files have been read.
@@ -296,9 +402,12 @@ class PatentsFilesCursor(ItemsCursor):
             self.eof = True
             return
 
-        # Container parsing.
-        self.items = get_file_cache().read(
-            self.xml_contents[self.container_id], self.container_id
+        # Container parsing.  Container ids restart in each Zip file,
+        # and may refer to other patents once the file is read again.
+        self.items = get_file_cache(RETAINED_ELEMENTS).read(
+            self.xml_contents[self.container_id],
+            (self.xml_contents.identifier, self.container_id),
+            self.table.data_source.omitted_elements,
         )
         self.eof = False
         # The single container has been read. Set EOF in next Next call.
@@ -319,9 +428,41 @@ class PatentsElementsCursor(ElementsCursor):
         The table agument is a StreamingTable object"""
         super().__init__(table, parent_cursor)
         self.extract_multiple = table.get_table_meta().get_extract_multiple()
+        # Value extraction functions of the table's columns by ordinal
+        self.extractors = table.value_extractors
+        # Values of the current row's columns, extracted on demand
+        self.row_values = {}
+        # Set in Next() for each parent row
+        self.rowid_base = None
+        self.parent_container_id = None
+
+    def extracted_value(self, col):
+        """Return the value of the column with ordinal col obtained
+        through its extraction function.  The function is called at most
+        once for each row.  Columns without an extraction function
+        are NULL.  Not part of the apsw API."""
+        # Populating reads each column once, so test for a miss rather
+        # than raising and catching KeyError on every value.
+        row_values = self.row_values
+        if col in row_values:
+            return row_values[col]
+        extractor = self.extractors[col]
+        if extractor is None:
+            value = None
+        else:
+            value = extractor(self.current_row_value())
+        row_values[col] = value
+        return value
+
+    def Column(self, col):
+        """Return the value of the column with ordinal col"""
+        if col == -1:
+            return self.Rowid()
+        return self.extracted_value(col)
 
     def Next(self):
         """Advance to the next element."""
+        self.row_values.clear()
         while True:
             # End of File of patent cursor.
             if self.parent_cursor.Eof():
@@ -333,6 +474,11 @@ class PatentsElementsCursor(ElementsCursor):
                     self.parent_cursor.current_row_value()
                 )
                 self.element_index = -1
+                # The parent row stays the same over its elements.
+                self.rowid_base = self.parent_cursor.Rowid() << 14
+                self.parent_container_id = (
+                    self.parent_cursor.get_container_id()
+                )
             if not self.elements:
                 # If parent has no element moves to the next patent.
                 self.parent_cursor.Next()
@@ -379,26 +525,23 @@ class PatentsCursor(PatentsElementsCursor):
         """Return a unique id of the row along all records"""
         return self.item_index
 
-    # pylint: disable=too-many-return-statements
     def Column(self, col):
         """Return the value of the column with ordinal col"""
         # print(f"Column {col}")
+        if col > 1:
+            return self.extracted_value(col)
+
         if col == -1:
             return self.Rowid()
 
-        if col == 0:  # id
-            return self.files_cursor.get_container_id()
-
-        if col == 1:
-            return self.files_cursor.get_container_id()
-
-        extract_function = self.table.get_value_extractor_by_ordinal(col)
-        return extract_function(self.files_cursor.items)
+        # id and container_id
+        return self.files_cursor.get_container_id()
 
     # pylint: disable=arguments-differ
     def Filter(self, index_number, _index_name, constraint_args):
         """Always called first to initialize an iteration to the first row
         of the table according to the index"""
+        self.row_values.clear()
         self.files_cursor.Filter(index_number, _index_name, constraint_args)
         self.eof = self.files_cursor.Eof()
         if index_number & ROWID_INDEX:
@@ -409,6 +552,7 @@ class PatentsCursor(PatentsElementsCursor):
 
     def Next(self):
         """Advance to the next item."""
+        self.row_values.clear()
         self.item_index = 0
         self.files_cursor.Next()
         self.eof = self.files_cursor.eof
@@ -434,226 +578,109 @@ class PatentsDetailsCursor(PatentsElementsCursor):
     def Rowid(self):
         """Return a unique id of the row along all records.
         This allows for 16k elements."""
-        return (self.parent_cursor.Rowid() << 14) | self.element_index
+        return self.rowid_base | self.element_index
 
     def Column(self, col):
         """Return the value of the column with ordinal col"""
-        if col == 0:
-            return self.parent_cursor.get_container_id()
+        if col > 1:
+            return self.extracted_value(col)
 
-        if col == 1:
-            return self.parent_cursor.get_container_id()
+        if col == -1:
+            return self.Rowid()
 
-        return super().Column(col)
+        # id and container_id
+        return self.parent_container_id
 
 
 class PatentsCpcCursor(PatentsElementsCursor):
     """A cursor over any of a patent's Cooperative
     Patent Classification scheme (CPC) data."""
 
-    def __init__(self, table, parent_cursor):
-        """Not part of the apsw VTCursor interface.
-        The table argument is a StreamingTable object"""
-        super().__init__(table, parent_cursor)
-        self.extract_multiple = all_getter(
-            "us-bibliographic-data-grant/classifications-cpc/*"
-        )
-
-        # The are two types of cpc classifications,
-        # `main-cpc` or `further-cpc`, in both cases
-        # the XML pattern are the same and given
-        # in the list below.
-        column_names = [
-            "classification-cpc/cpc-version-indicator/date",
-            "classification-cpc/section",
-            "classification-cpc/class",
-            "classification-cpc/subclass",
-            "classification-cpc/main-group",
-            "classification-cpc/subgroup",
-            "classification-cpc/symbol-position",
-            "classification-cpc/classification-value",
-            "classification-cpc/action-date/date",
-            "classification-cpc/generating-office/country",
-            "classification-cpc/classification-status",
-            "classification-cpc/classification-data-source",
-            "classification-cpc/scheme-origination-code",
-            "combination-set/group-number",
-            "combination-set/combination-rank/rank-number",
-        ]
-
-        self.column_contents = {
-            i + 3: value for i, value in enumerate(column_names)
-        }
-
     def Rowid(self):
         """Return a unique id of the row along all records.
         This allows for 16k elements."""
-        return (self.parent_cursor.Rowid() << 14) | self.element_index
+        return self.rowid_base | self.element_index
 
     def Column(self, col):
         """Return the value of the column with ordinal col"""
-        if col == 0:
-            return self.parent_cursor.get_container_id()
-
-        if col == 1:
-            return self.parent_cursor.get_container_id()
+        if col > 2:
+            return self.extracted_value(col)
 
         if col == 2:
-            return self.elements[self.record_id()].tag
+            return self.current_row_value().tag
 
-        if col >= 3:
-            return get_element(
-                self.elements[self.record_id()],
-                f"{self.column_contents[col]}",
-            )
+        if col == -1:
+            return self.Rowid()
 
-        return super().Column(col)
+        # id and container_id
+        return self.parent_container_id
 
 
 class PatentsRelatedDocumentsCursor(PatentsElementsCursor):
     """A cursor over any of a patent's related documents data."""
 
-    def __init__(self, table, parent_cursor):
-        """Not part of the apsw VTCursor interface.
-        The table argument is a StreamingTable object"""
-        super().__init__(table, parent_cursor)
-        self.extract_multiple = all_getter(
-            "us-bibliographic-data-grant/us-related-documents/*"
-        )
-        column_names = [
-            "relation/parent-doc/document-id/doc-number",
-            "relation/parent-doc/document-id/kind",
-            "relation/parent-doc/document-id/name",
-            "relation/parent-doc/document-id/date",
-            "relation/parent-doc/parent-status",
-            "relation/parent-doc/parent-grant-document/document-id/doc-number",
-            "relation/parent-doc/parent-pct-document/document-id/doc-number",
-            "relation/parent-doc/international-filing-date",
-            "relation/child-doc/document-id/doc-number",
-            "relation/child-doc/document-id/kind",
-            "relation/child-doc/document-id/name",
-            "relation/child-doc/document-id/date",
-            "relation/child-doc/international-filing-date",
-            "document-id/doc-number",
-            "document-id/kind",
-            "document-id/name",
-            "document-id/date",
-            "us-provisional-application-status",
-            "document-corrected/document-id/doc-number",
-            "document-corrected/document-id/kind",
-            "document-corrected/document-id/name",
-            "document-corrected/document-id/date",
-            "type-of-correction",
-            "gazette-reference/gazette-num",
-            "gazette-reference/date",
-            "text",
-        ]
-
-        self.column_contents = {
-            i + 3: value for i, value in enumerate(column_names)
-        }
-
     def Rowid(self):
         """Return a unique id of the row along all records.
         This allows for 16k elements."""
-        return (self.parent_cursor.Rowid() << 14) | self.element_index
+        return self.rowid_base | self.element_index
 
     def Column(self, col):
         """Return the value of the column with ordinal col"""
-        if col == 0:
-            return self.parent_cursor.get_container_id()
-
-        if col == 1:
-            return self.parent_cursor.get_container_id()
+        if col > 2:
+            return self.extracted_value(col)
 
         if col == 2:
-            return self.elements[self.record_id()].tag
+            return self.current_row_value().tag
 
-        if col >= 3:
-            return get_element(
-                self.elements[self.record_id()],
-                f"{self.column_contents[col]}",
-            )
+        if col == -1:
+            return self.Rowid()
 
-        return super().Column(col)
+        # id and container_id
+        return self.parent_container_id
 
 
-class PatentsAssigneesCursor(PatentsElementsCursor):
-    """A cursor over any of a patent's assignees data"""
+def assignee_getter(path):
+    """Return a function to return the text of the element with the
+    specified path from a given assignee.  If the assignee has an
+    addressbook element, the path is looked up under it."""
+    get = getter(path)
+    if path.startswith("addressbook/"):
+        return get
+    # Append addressbook string to meet XML pattern.
+    get_in_addressbook = getter("addressbook/" + path)
 
-    def __init__(self, table, parent_cursor):
-        """Not part of the apsw VTCursor interface. The table argument is a
-        StreamingTable object. The data under the assignee element can be
-        either an entity called %name_group or an addressbook element.
-        However, under the addressbook element the data appear again as
-        %name_group, with some additional elements."""
+    def get_assignee(assignee):
+        # Check if a non-empty addressbook element exists.
+        addressbook = assignee.find("addressbook")
+        if addressbook is not None and len(addressbook):
+            return get_in_addressbook(assignee)
+        return get(assignee)
+
+    return get_assignee
 
-        super().__init__(table, parent_cursor)
-        # Get all the assignees
-        self.extract_multiple = all_getter(
-            "us-bibliographic-data-grant/assignees/*"
-        )
 
-        # Initialize a list of XML patterns to access the data of the
-        # assignee element. If an addressbook element exist under
-        # the assignee, then it is appended on the beginning of the string
-        # for matching the required elements.
-        column_names = [
-            "name",
-            "first-name",
-            "middle-name",
-            "last-name",
-            "orgname",
-            "suffix",
-            "iid",
-            "role",
-            "department",
-            "synonym",
-            "registered_number",
-            "email",
-            "url",
-            "text",
-            "addressbook/address/city",
-            "addressbook/address/state",
-            "addressbook/address/country",
-            "addressbook/address/postcode",
-        ]
-
-        self.column_contents = {
-            i + 3: value for i, value in enumerate(column_names)
-        }
+class PatentsAssigneesCursor(PatentsElementsCursor):
+    """A cursor over any of a patent's assignees data.
+    The data under the assignee element can be either an entity called
+    %name_group or an addressbook element.  However, under the
+    addressbook element the data appear again as %name_group, with some
+    additional elements; the columns' assignee_getter handles both."""
 
     def Rowid(self):
         """Return a unique id of the row along all records.
         This allows for 16k elements."""
-        return (self.parent_cursor.Rowid() << 14) | self.element_index
+        return self.rowid_base | self.element_index
 
-    # pylint: disable=too-many-return-statements
     def Column(self, col):
         """Return the value of the column with ordinal col"""
-        if col == 0:
-            return self.parent_cursor.get_container_id()
-
-        if col == 1:
-            return self.parent_cursor.get_container_id()
+        if col > 1:
+            return self.extracted_value(col)
 
-        if col == 2:
-            return self.elements[self.record_id()].tag
-
-        if col >= 3:
-            # Check if an addressbook element exists.
-            if self.elements[self.record_id()].find("addressbook"):
-                # Append addressbook string to meet XML pattern.
-                pattern = "addressbook/" + f"{self.column_contents[col]}"
-
-                return get_element(self.elements[self.record_id()], pattern)
-            # If false use the dictionary without addressbook.
-            return get_element(
-                self.elements[self.record_id()],
-                f"{self.column_contents[col]}",
-            )
+        if col == -1:
+            return self.Rowid()
 
-        return super().Column(col)
+        # id and container_id
+        return self.parent_container_id
 
 
 class USPartiesTableMeta(TableMeta):
@@ -1049,35 +1076,64 @@ tables = [
         parent_name="us_patents",
         primary_key="id",
         cursor_class=PatentsCpcCursor,
+        # Both main-cpc and further-cpc elements, whose classifications
+        # have the same structure
         extract_multiple=all_getter(
-            "us-bibliographic-data-grant/classifications-cpc"
+            "us-bibliographic-data-grant/classifications-cpc/*"
         ),
         columns=[
             ColumnMeta("patent_id"),
             ColumnMeta("container_id"),
             ColumnMeta(
                 "type",
-                getter("ipc-version-indicator/date"),
                 description="Main or further cpc.",
             ),
             ColumnMeta(
                 "cpc_version_indicator",
+                getter("classification-cpc/cpc-version-indicator/date"),
                 description="Date.",
             ),
-            ColumnMeta("section"),
-            ColumnMeta("class"),
-            ColumnMeta("sub_class"),
-            ColumnMeta("main_group"),
-            ColumnMeta("sub_group"),
-            ColumnMeta("symbol_position"),
-            ColumnMeta("class_value"),
-            ColumnMeta("action_date"),
-            ColumnMeta("generating_office"),
-            ColumnMeta("class_status"),
-            ColumnMeta("class_data_source"),
-            ColumnMeta("scheme_origination_code"),
-            ColumnMeta("combination_group_number"),
-            ColumnMeta("combination_rank_number"),
+            ColumnMeta("section", getter("classification-cpc/section")),
+            ColumnMeta("class", getter("classification-cpc/class")),
+            ColumnMeta("sub_class", getter("classification-cpc/subclass")),
+            ColumnMeta("main_group", getter("classification-cpc/main-group")),
+            ColumnMeta("sub_group", getter("classification-cpc/subgroup")),
+            ColumnMeta(
+                "symbol_position",
+                getter("classification-cpc/symbol-position"),
+            ),
+            ColumnMeta(
+                "class_value",
+                getter("classification-cpc/classification-value"),
+            ),
+            ColumnMeta(
+                "action_date",
+                getter("classification-cpc/action-date/date"),
+            ),
+            ColumnMeta(
+                "generating_office",
+                getter("classification-cpc/generating-office/country"),
+            ),
+            ColumnMeta(
+                "class_status",
+                getter("classification-cpc/classification-status"),
+            ),
+            ColumnMeta(
+                "class_data_source",
+                getter("classification-cpc/classification-data-source"),
+            ),
+            ColumnMeta(
+                "scheme_origination_code",
+                getter("classification-cpc/scheme-origination-code"),
+            ),
+            ColumnMeta(
+                "combination_group_number",
+                getter("combination-set/group-number"),
+            ),
+            ColumnMeta(
+                "combination_rank_number",
+                getter("combination-set/combination-rank/rank-number"),
+            ),
         ],
     ),
     TableMeta(
@@ -1086,88 +1142,97 @@ tables = [
         parent_name="us_patents",
         primary_key="id",
         cursor_class=PatentsRelatedDocumentsCursor,
+        extract_multiple=all_getter(
+            "us-bibliographic-data-grant/us-related-documents/*"
+        ),
         columns=[
             ColumnMeta("patent_id"),
             ColumnMeta("container_id"),
             ColumnMeta("relation"),
             ColumnMeta(
                 "parent_doc_number",
+                getter("relation/parent-doc/document-id/doc-number"),
             ),
             ColumnMeta(
                 "parent_doc_kind",
+                getter("relation/parent-doc/document-id/kind"),
             ),
             ColumnMeta(
                 "parent_doc_name",
+                getter("relation/parent-doc/document-id/name"),
             ),
             ColumnMeta(
                 "parent_doc_date",
+                getter("relation/parent-doc/document-id/date"),
             ),
-            ColumnMeta(
-                "status",
-            ),
+            ColumnMeta("status", getter("relation/parent-doc/parent-status")),
             ColumnMeta(
                 "parent_grant_doc_number",
+                getter(
+                    "relation/parent-doc/parent-grant-document/document-id/doc-number"
+                ),
             ),
             ColumnMeta(
                 "parent_pct_doc_number",
+                getter(
+                    "relation/parent-doc/parent-pct-document/document-id/doc-number"
+                ),
             ),
             ColumnMeta(
                 "parent_filing_date",
+                getter("relation/parent-doc/international-filing-date"),
             ),
             ColumnMeta(
                 "child_doc_number",
+                getter("relation/child-doc/document-id/doc-number"),
             ),
             ColumnMeta(
                 "child_doc_kind",
+                getter("relation/child-doc/document-id/kind"),
             ),
             ColumnMeta(
                 "child_doc_name",
+                getter("relation/child-doc/document-id/name"),
             ),
             ColumnMeta(
                 "child_doc_date",
+                getter("relation/child-doc/document-id/date"),
             ),
             ColumnMeta(
                 "child_filing_date",
+                getter("relation/child-doc/international-filing-date"),
             ),
-            ColumnMeta(
-                "document_number",
-            ),
-            ColumnMeta(
-                "document_kind",
-            ),
-            ColumnMeta(
-                "document_name",
-            ),
-            ColumnMeta(
-                "document_date",
-            ),
+            ColumnMeta("document_number", getter("document-id/doc-number")),
+            ColumnMeta("document_kind", getter("document-id/kind")),
+            ColumnMeta("document_name", getter("document-id/name")),
+            ColumnMeta("document_date", getter("document-id/date")),
             ColumnMeta(
                 "provisional_application_status",
+                getter("us-provisional-application-status"),
             ),
             ColumnMeta(
                 "corrected_document_doc_number",
+                getter("document-corrected/document-id/doc-number"),
             ),
             ColumnMeta(
                 "corrected_document_kind",
+                getter("document-corrected/document-id/kind"),
             ),
             ColumnMeta(
                 "corrected_document_name",
+                getter("document-corrected/document-id/name"),
             ),
             ColumnMeta(
                 "corrected_document_date",
+                getter("document-corrected/document-id/date"),
             ),
-            ColumnMeta(
-                "type_of_correction",
-            ),
+            ColumnMeta("type_of_correction", getter("type-of-correction")),
             ColumnMeta(
                 "gazette_number",
+                getter("gazette-reference/gazette-num"),
             ),
-            ColumnMeta(
-                "gazette_date",
-            ),
-            ColumnMeta(
-                "correction_text",
-            ),
+            ColumnMeta("gazette_date", getter("gazette-reference/date")),
+            ColumnMeta("correction_text", getter("text")),
         ],
     ),
     TableMeta(
@@ -1311,30 +1376,37 @@ tables = [
         parent_name="us_patents",
         primary_key="id",
         cursor_class=PatentsAssigneesCursor,
-        extract_multiple=all_getter(
-            "us-bibliographic-data-grant/assignees/assignee"
-        ),
+        extract_multiple=all_getter("us-bibliographic-data-grant/assignees/*"),
         columns=[
             ColumnMeta("patent_id"),
             ColumnMeta("container_id"),
-            ColumnMeta("name"),
-            ColumnMeta("first_name"),
-            ColumnMeta("middle_name"),
-            ColumnMeta("last_name"),
-            ColumnMeta("org_name"),
-            ColumnMeta("suffix"),
-            ColumnMeta("iid"),
-            ColumnMeta("role"),
-            ColumnMeta("department"),
-            ColumnMeta("synonym"),
-            ColumnMeta("registered_number"),
-            ColumnMeta("email"),
-            ColumnMeta("url"),
-            ColumnMeta("text"),
-            ColumnMeta("city"),
-            ColumnMeta("state"),
-            ColumnMeta("country"),
-            ColumnMeta("postcode"),
+            ColumnMeta("name", assignee_getter("name")),
+            ColumnMeta("first_name", assignee_getter("first-name")),
+            ColumnMeta("middle_name", assignee_getter("middle-name")),
+            ColumnMeta("last_name", assignee_getter("last-name")),
+            ColumnMeta("org_name", assignee_getter("orgname")),
+            ColumnMeta("suffix", assignee_getter("suffix")),
+            ColumnMeta("iid", assignee_getter("iid")),
+            ColumnMeta("role", assignee_getter("role")),
+            ColumnMeta("department", assignee_getter("department")),
+            ColumnMeta("synonym", assignee_getter("synonym")),
+            ColumnMeta(
+                "registered_number",
+                assignee_getter("registered_number"),
+            ),
+            ColumnMeta("email", assignee_getter("email")),
+            ColumnMeta("url", assignee_getter("url")),
+            ColumnMeta("text", assignee_getter("text")),
+            ColumnMeta("city", assignee_getter("addressbook/address/city")),
+            ColumnMeta("state", assignee_getter("addressbook/address/state")),
+            ColumnMeta(
+                "country",
+                assignee_getter("addressbook/address/country"),
+            ),
+            ColumnMeta(
+                "postcode",
+                assignee_getter("addressbook/address/postcode"),
+            ),
         ],
     ),
     TableMeta(
@@ -1514,7 +1586,7 @@ class Uspto(DataSource):
     :type uspto_directory: str
 
     :param sample: A callable to control Zip file and container sampling.
-        It defaults to `lambda x: True`. The population or query method
+        It defaults to sampling everything. The population or query method
         will call this with a tuple as its argument, where the first value
         is a designator string that can be either "path" or "container" and
         the second value can be an USPTO Zip file path or a container respectively.
@@ -1544,7 +1616,7 @@ class Uspto(DataSource):
     def __init__(
         self,
         uspto_directory,
-        sample=lambda n: True,
+        sample=sample_all,
         attach_databases=None,
     ):
         super().__init__(
@@ -1552,3 +1624,42 @@ class Uspto(DataSource):
             tables,
             attach_databases,
         )
+
+    def access_tables(self, *statements):
+        """Have the elements of the tables named in the specified SQL
+        text parsed, before any of the tables' cursors is opened.
+        Otherwise a patent already parsed for one table would have
+        to be parsed again for a later one."""
+        words = set()
+        for statement in statements:
+            if statement:
+                words.update(re.findall(r"\w+", statement))
+        self.data_source.data_files.access_tables(
+            words & self.table_dict.keys()
+        )
+
+    def query(self, query, partition=False):
+        """Run the specified query, as described in DataSource.query,
+        parsing only the elements of the tables it names.  The Zip files
+        are extracted in the background while the results are iterated."""
+        self.access_tables(query)
+        with prefetching():
+            yield from super().query(query, partition)
+
+    def populate(self, database_path, columns=None, condition=None):
+        """Populate the specified database, as described in
+        DataSource.populate, parsing only the elements of the tables
+        it involves.  When the condition only concerns the patents'
+        type, patents of other types, as identified by their file name,
+        are not parsed."""
+        if columns:
+            self.access_tables(condition, *columns)
+        else:
+            self.access_tables(condition, " ".join(self.table_dict))
+        data_files = self.data_source.data_files
+        data_files.container_pattern = file_name_pattern(condition)
+        try:
+            with prefetching():
+                super().populate(database_path, columns, condition)
+        finally:
+            data_files.container_pattern = None
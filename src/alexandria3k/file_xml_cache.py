@@ -18,46 +18,186 @@
 #
 """Cache of read and parsed XML files"""
 
+import collections
+import functools
+import re
+import threading
 import xml.etree.ElementTree as ET
 
+# Number of parsed XML files kept in the cache
+CACHE_SIZE = 8
+
+# The name of a document's root element, i.e. of its first start tag
+ROOT_TAG = re.compile(rb"<([A-Za-z_][\w.-]*)")
+
 
 class FileCache:
-    """Cache the reading of a single concatenated XML file"""
+    """Cache the reading of the most recently used concatenated XML files"""
 
     # pylint: disable=too-few-public-methods
     parse_counter = 0
 
-    def __init__(self):
+    def __init__(self, retained_elements=None, size=CACHE_SIZE):
+        # The most recently read file and the elements omitted from it
         self.cached_patent_xml_id = None
         self.cached_data = None
-
-    def read(self, xml_chunk, container_id):
+        self.cached_omitted = frozenset()
+        # Up to size tuples of parsed files and their omitted elements,
+        # by the files' id in least recently used order
+        self.parsed = collections.OrderedDict()
+        self.size = size
+        # Tags of the root's children to keep; None keeps all of them.
+        self.retained_elements = retained_elements
+        # Matches up to the last end tag of the retained elements
+        self.retained_end_pattern = None
+        if retained_elements is not None:
+            self.retained_end_pattern = re.compile(
+                rb"(?s:.*)</(?:"
+                + b"|".join(
+                    re.escape(tag.encode("ascii")) for tag in retained_elements
+                )
+                + b")>"
+            )
+
+    def read(self, xml_chunk, container_id, omitted_elements=frozenset()):
         """
-        Compares container_id with cached_patent_xml_id. Return
+        Compares container_id with the ids of the cached files. Return
         the parsed contents of the specified container id in etree
         form. Repeated parsing is avoided through caching.
 
-        :param xml_chunk: A string containing the contents of a XML file,
-            representing a complete US patent.
+        :param xml_chunk: A string or bytes containing the contents of
+            a XML file, representing a complete US patent.
+
+        :param container_id: A hashable identifier of US patents.
 
-        :param container_id: An int identifier of US patents.
+        :param omitted_elements: A frozenset of tags of elements that
+            need not be parsed, because no caller will access them.
+            A cached tree is returned if it lacks none of the others.
 
         """
 
-        if container_id == self.cached_patent_xml_id:
+        if (
+            container_id == self.cached_patent_xml_id
+            and self.cached_omitted <= omitted_elements
+        ):
             return self.cached_data
 
-        self.cached_data = ET.fromstring(xml_chunk)
-        self.cached_patent_xml_id = container_id
+        entry = self.parsed.get(container_id)
+        if entry is None or not entry[1] <= omitted_elements:
+            entry = (self.parse(xml_chunk, omitted_elements), omitted_elements)
+            self.parsed[container_id] = entry
+            if len(self.parsed) > self.size:
+                self.parsed.popitem(last=False)
+        self.parsed.move_to_end(container_id)
 
-        FileCache.parse_counter += 1
+        (self.cached_data, self.cached_omitted) = entry
+        self.cached_patent_xml_id = container_id
         return self.cached_data
 
-
-# Default
-file_cache = FileCache()
-
-
-def get_file_cache():
-    """Return the file cache used"""
-    return file_cache
+    def clear(self):
+        """Discard all cached parsed files."""
+        self.cached_patent_xml_id = None
+        self.cached_data = None
+        self.parsed.clear()
+
+    def parse(self, xml_chunk, omitted_elements=frozenset()):
+        """Return the etree of the specified XML file contents,
+        possibly without the specified omitted elements"""
+        # Not lxml: its per-element Python proxies make lookups slower.
+        tree = None
+        if self.retained_elements is not None:
+            tree = self.parse_retained(xml_chunk, omitted_elements)
+        if tree is None:
+            tree = ET.fromstring(xml_chunk)
+        if self.retained_elements is not None:
+            # Release the subtrees that no table accesses.
+            for element in list(tree):
+                if element.tag not in self.retained_elements:
+                    tree.remove(element)
+        FileCache.parse_counter += 1
+        return tree
+
+    def parse_retained(self, xml_chunk, omitted_elements=frozenset()):
+        """Return the etree of the specified XML file contents up to the
+        end of its last retained element, thereby skipping the parsing of
+        trailing elements (e.g. the abstract) that would be dropped.
+        The first element with each of the specified omitted tags is
+        also skipped.  Return None if the contents require a complete
+        parse."""
+        if isinstance(xml_chunk, str):
+            return None
+        # Scanned and fed to the parser without copying the patent
+        view = memoryview(xml_chunk)
+        last_end_tag = self.retained_end_pattern.match(view)
+        root = ROOT_TAG.search(view)
+        if last_end_tag is None or root is None:
+            return None
+        end = last_end_tag.end()
+        # A parser cannot be fed again after close().  Comments and
+        # processing instructions are already dropped, and whitespace-only
+        # text adds no nodes to the tree.
+        parser = ET.XMLParser()
+        try:
+            position = 0
+            for start, stop in omitted_extents(view, end, omitted_elements):
+                parser.feed(view[position:start])
+                position = stop
+            parser.feed(view[position:end])
+            # Close the root element after the last retained one.
+            parser.feed(b"</" + bytes(root.group(1)) + b">")
+            return parser.close()
+        except ET.ParseError:
+            # E.g. the end tag belongs to a nested element of that name.
+            return None
+
+
+@functools.lru_cache(maxsize=None)
+def start_tag_pattern(tag):
+    """Return a compiled expression matching the start tag of an element
+    with the specified tag."""
+    return re.compile(b"<" + tag.encode("ascii") + rb"[\s>]")
+
+
+@functools.lru_cache(maxsize=None)
+def end_tag_pattern(tag):
+    """Return a compiled expression matching the end tag of an element
+    with the specified tag."""
+    return re.compile(b"</" + tag.encode("ascii") + b">")
+
+
+def omitted_extents(data, end, omitted_elements):
+    """Return a sorted list with the (start, stop) offsets of the first
+    element having each of the specified tags within data[:end].
+    The data can be any bytes-like object, e.g. a memoryview."""
+    extents = []
+    for tag in omitted_elements:
+        start = start_tag_pattern(tag).search(data, 0, end)
+        if start is None:
+            continue
+        stop = end_tag_pattern(tag).search(data, start.start(), end)
+        if stop is None:
+            continue
+        extents.append((start.start(), stop.end()))
+    extents.sort()
+    for previous, following in zip(extents, extents[1:]):
+        if previous[1] > following[0]:
+            # Nested; parse everything rather than guess
+            return []
+    return extents
+
+
+# Default caches, one for each thread
+thread_data = threading.local()
+
+
+def get_file_cache(retained_elements=None):
+    """Return the file cache used by the calling thread for files whose
+    root children with the specified tags are retained"""
+    try:
+        caches = thread_data.file_caches
+    except AttributeError:
+        caches = thread_data.file_caches = {}
+    cache = caches.get(retained_elements)
+    if cache is None:
+        cache = caches[retained_elements] = FileCache(retained_elements)
+    return cache
@@ -18,10 +18,241 @@
 #
 """Cache of decompressed/extracted path of US patent data"""
 
+from concurrent.futures import ProcessPoolExecutor
+import contextlib
+import itertools
+import mmap
+import multiprocessing
+import os
+import tempfile
+import threading
 import zipfile
 
 # Delimiter for extracting concatenated XML files.
 XML_DELIMITER = '<?xml version="1.0" encoding="UTF-8"?>'
+XML_DELIMITER_BYTES = XML_DELIMITER.encode("ascii")
+
+# Size of the blocks read from the compressed XML file.  Requesting large
+# blocks has zlib decompress the Zip entry in correspondingly large steps,
+# rather than in the 8 KiB units of a default buffered copy.
+READ_BLOCK_SIZE = 1024 * 1024
+
+# Number of worker processes extracting upcoming Zip files in the
+# background, and thereby the number of Zip files extracted ahead.
+# Extracting a Zip file takes about a fifth of the time needed to parse
+# its patents, which the querying process must do itself, so more
+# workers would only add scratch files, not throughput.
+PREFETCH_WORKERS = min(os.cpu_count() or 1, 2)
+
+
+def sample_all(_data):
+    """The default sampling callable, which selects all Zip files and
+    patents.  Patents are not decoded into strings for it."""
+    return True
+
+
+def iter_patent_views(xml_file, block_size=READ_BLOCK_SIZE):
+    """Yield a memoryview of each XML document concatenated in the
+    specified binary file, without its XML declaration.
+    The file is read in blocks, so that only the block and the
+    patent being scanned are kept in memory.  No patent is copied:
+    each view refers to the read buffer and is released when the next
+    one is requested, so its contents must be used or copied before.
+
+    :param xml_file: A binary file object with concatenated XML documents.
+
+    :param block_size: The number of bytes to read in each step.
+    """
+    delimiter_length = len(XML_DELIMITER_BYTES)
+    buffer = bytearray()
+    # Buffer offset of the current patent's content; None before the first
+    start = None
+    # Buffer offset from which to search for the next delimiter
+    scan = 0
+    while True:
+        block = xml_file.read(block_size)
+        buffer += block
+        while True:
+            end = buffer.find(XML_DELIMITER_BYTES, scan)
+            if end == -1:
+                break
+            if start is not None:
+                # Released before the buffer is resized
+                with memoryview(buffer) as view, view[start:end] as patent:
+                    yield patent
+            start = end + delimiter_length
+            scan = start
+        if not block:
+            break
+        # A delimiter may straddle the boundary of the next block.
+        scan = max(scan, len(buffer) - delimiter_length + 1)
+        # Discard the data that has already been scanned or yielded.
+        consumed = scan if start is None else start
+        del buffer[:consumed]
+        scan -= consumed
+        if start is not None:
+            start = 0
+    if start is not None:
+        with memoryview(buffer) as view, view[start:] as patent:
+            yield patent
+
+
+class PatentChunks:
+    """A read-only sequence of the XML chunks of a Zip file's patents.
+    Only the chunk offsets are kept in memory; the chunks are stored
+    in a scratch file, which is memory-mapped once it is complete."""
+
+    # Source of identifiers distinguishing every sequence
+    identifiers = itertools.count()
+
+    def __init__(self, scratch=None):
+        if scratch is None:
+            # pylint: disable-next=consider-using-with
+            scratch = tempfile.TemporaryFile()
+        self.scratch = scratch
+        # Unique within the process, unlike the Zip path, through which
+        # different contents can be read over time
+        self.identifier = next(PatentChunks.identifiers)
+        # Tuples of (offset, length) for each patent.
+        self.extents = []
+        # Set in finish()
+        self.mapping = None
+
+    def append(self, chunk):
+        """Add the specified bytes chunk at the end of the sequence."""
+        self.extents.append((self.scratch.tell(), len(chunk)))
+        self.scratch.write(chunk)
+
+    def finish(self):
+        """Map the completed scratch file into memory for reading.
+        The mapping outlives the file, which is closed and thereby
+        removed."""
+        self.scratch.flush()
+        # An empty file cannot be mapped; there is nothing to read then.
+        if self.extents:
+            self.mapping = mmap.mmap(
+                self.scratch.fileno(), 0, access=mmap.ACCESS_READ
+            )
+            # Patents are mostly parsed in sequence; have the kernel
+            # read ahead the mapped pages.  Not available on all systems.
+            if hasattr(mmap, "MADV_SEQUENTIAL"):
+                self.mapping.madvise(mmap.MADV_SEQUENTIAL)
+        self.scratch.close()
+
+    @classmethod
+    def from_file(cls, scratch_path, extents):
+        """Return the chunks at the specified extents of a scratch file
+        written by extract_patents.  The file is removed once mapped."""
+        with open(scratch_path, "rb") as scratch:
+            chunks = cls(scratch)
+            chunks.extents = extents
+            chunks.finish()
+        os.remove(scratch_path)
+        return chunks
+
+    def __len__(self):
+        return len(self.extents)
+
+    def __getitem__(self, index):
+        """Return a read-only view of the XML chunk at the specified index
+        without copying its bytes."""
+        (offset, length) = self.extents[index]
+        return memoryview(self.mapping)[offset : offset + length]
+
+
+def extract_patents(zip_path, directory=None):
+    """Extract the patents of the specified Zip file into a new scratch
+    file in directory.  This is a top-level function so that it can
+    run in a worker process.
+
+    :param zip_path: Path to the Zip file.
+
+    :param directory: The directory of the scratch file.
+
+    Return a tuple with the name of the Zip's XML file, the path of the
+    scratch file, and the (offset, length) extents of its patents.
+    """
+    (fd, scratch_path) = tempfile.mkstemp(dir=directory)
+    with open(fd, "wb") as scratch, zipfile.ZipFile(zip_path, "r") as zip_ref:
+        chunks = PatentChunks(scratch)
+        (file_name,) = [
+            file for file in zip_ref.namelist() if file.endswith(".xml")
+        ]
+        with zip_ref.open(file_name) as xml_content:
+            for patent_xml in iter_patent_views(xml_content):
+                chunks.append(patent_xml)
+    return (file_name, scratch_path, chunks.extents)
+
+
+def prefetch_enabled():
+    """Return True if Zip files can be extracted in worker processes.
+    Other start methods than fork re-import the main module in each
+    worker, which fails for scripts that do not guard their code with
+    if __name__ == "__main__".  Prefetching therefore does not run
+    on Windows and macOS, nor, from Python 3.14, on Linux, unless the
+    program sets the fork start method."""
+    method = multiprocessing.get_start_method(allow_none=True)
+    if method is None:
+        # The first of the methods is the platform's default.
+        method = multiprocessing.get_all_start_methods()[0]
+    return method == "fork"
+
+
+# The process pool extracting Zip files in the background, the temporary
+# directory of the scratch files it writes, and the number of prefetching
+# contexts using them; shared by all threads
+prefetch_workers = None
+prefetch_directory = None
+prefetch_users = 0
+prefetch_lock = threading.Lock()
+
+
+@contextlib.contextmanager
+def prefetching():
+    """Context manager having Zip files extracted in the background by
+    worker processes for its duration, if they are available.
+    The workers are started on entry, rather than from within the
+    callbacks reading the files, and shut down on exit, when the
+    scratch files are also removed.  Contexts can be nested."""
+    # pylint: disable-next=global-statement,invalid-name
+    global prefetch_workers, prefetch_directory, prefetch_users
+    with prefetch_lock:
+        if prefetch_users == 0 and prefetch_enabled():
+            # pylint: disable-next=consider-using-with
+            prefetch_directory = tempfile.TemporaryDirectory(
+                prefix="alexandria3k-"
+            )
+            prefetch_workers = ProcessPoolExecutor(
+                max_workers=PREFETCH_WORKERS
+            )
+            # Fork the workers now; they are otherwise started on demand.
+            prefetch_workers.submit(int)
+        prefetch_users += 1
+    try:
+        yield
+    finally:
+        with prefetch_lock:
+            prefetch_users -= 1
+            if prefetch_users == 0 and prefetch_workers is not None:
+                get_zip_cache().prefetch([])
+                prefetch_workers.shutdown(cancel_futures=True)
+                prefetch_directory.cleanup()
+                prefetch_workers = None
+                prefetch_directory = None
+
+
+def discard_extraction(future):
+    """Cancel the specified background extraction or, if it has already
+    started, remove its scratch file once it is written."""
+
+    def remove_scratch(future):
+        if not future.cancelled() and future.exception() is None:
+            # Already removed if prefetching has ended.
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(future.result()[1])
+
+    if not future.cancel():
+        future.add_done_callback(remove_scratch)
 
 
 class UsptoZipCache:
@@ -32,55 +263,136 @@ class UsptoZipCache:
 
     def __init__(self):
         self.cached_path = None
+        # The sampling callable through which the cached data were read,
+        # and the Zip file's modification time and size at that point
+        self.cached_sampling = None
+        self.cached_status = None
         self.cached_data = []
         self.file_name = None
+        # Background extractions of upcoming Zip files, keyed by path
+        self.pending = {}
+
+    def prefetch(self, zip_paths):
+        """Start extracting the specified Zip files in worker processes,
+        so that they can be read without waiting for their decompression.
+        Discard any pending extractions of other files.
+        Nothing is started outside a prefetching() context.
 
-    def read(self, zip_path, sampling=lambda n: True):
-        """Return a list of XML containers in the specified zip file.
+        :param zip_paths: Paths to the Zip files to be read next.
+        """
+        for path in list(self.pending):
+            if path not in zip_paths:
+                discard_extraction(self.pending.pop(path))
+        executor = prefetch_workers
+        if not zip_paths or executor is None:
+            return
+        for path in zip_paths:
+            if path not in self.pending and path != self.cached_path:
+                try:
+                    self.pending[path] = executor.submit(
+                        extract_patents, path, prefetch_directory.name
+                    )
+                except RuntimeError:
+                    # E.g. BrokenProcessPool, or the pool shut down as
+                    # prefetching ended; the files are then extracted
+                    # when they are read.
+                    return
+
+    def read(self, zip_path, sampling=sample_all):
+        """Return a sequence of XML containers in the specified zip file.
 
         :param zip_path: Path to the Zip file.
 
         :param sampling: callable
         """
 
-        # Compare Zip path for caching.
-        if zip_path == self.cached_path:
+        # Compare the path and the sampling for caching.  Modifications
+        # of the file are detected through revalidate().
+        if zip_path == self.cached_path and sampling == self.cached_sampling:
             return self.cached_data
+        status = os.stat(zip_path)
 
-        self.cached_data = []
-        with zipfile.ZipFile(zip_path, "r") as zip_ref:
-            # There is only one XML file inside the Zip file.
-            xml_file = [
-                file for file in zip_ref.namelist() if file.endswith(".xml")
-            ]
-
-            # Extract filename and decoding the XML
-            (self.file_name,) = xml_file
-            xml_content = zip_ref.read(self.file_name).decode("utf-8")
-
-            # The first item of the list is None.
-            patent_xml_files_list = xml_content.split(XML_DELIMITER)[1:]
-
-            # When sampling returns False it will skip the container.
-            # Sample the patents inside the Zip file by passing to the sampling
-            # function a tuple with the designator string being "container"
-            # and the second value being a string that contains all the
-            # contents of a unique US patent.
-            # (e.g. random.random() < 0.1 if data[0] == ""container"" else True)
-            self.cached_data = [
-                patent_xml
-                for patent_xml in patent_xml_files_list
-                if sampling(("container", patent_xml))
-            ]
-            self.cached_path = zip_path
-            UsptoZipCache.file_reads += 1
+        # When sampling returns False it will skip the container.
+        # Sample the patents inside the Zip file by passing to the sampling
+        # function a tuple with the designator string being "container"
+        # and the second value being a string that contains all the
+        # contents of a unique US patent.
+        # (e.g. random.random() < 0.1 if data[0] == ""container"" else True)
+        future = self.pending.pop(zip_path, None)
+        extracted = None
+        if future is not None:
+            try:
+                (self.file_name, scratch_path, extents) = future.result()
+                extracted = PatentChunks.from_file(scratch_path, extents)
+            # pylint: disable-next=broad-exception-caught
+            except Exception:
+                # E.g. BrokenProcessPool, or the scratch file removed as
+                # prefetching ended; extract it here instead.
+                extracted = None
+        if extracted is not None:
+            # Extracted by a worker; the sampling callable, which need
+            # not be picklable, is applied here.
+            self.cached_data = extracted
+            if sampling is not sample_all:
+                self.cached_data.extents = [
+                    extent
+                    for (i, extent) in enumerate(extracted.extents)
+                    if sampling(("container", str(extracted[i], "utf-8")))
+                ]
+        else:
+            self.cached_data = PatentChunks()
+            with zipfile.ZipFile(zip_path, "r") as zip_ref:
+                # There is only one XML file inside the Zip file.
+                xml_file = [
+                    file
+                    for file in zip_ref.namelist()
+                    if file.endswith(".xml")
+                ]
+                (self.file_name,) = xml_file
+
+                with zip_ref.open(self.file_name) as xml_content:
+                    for patent_xml in iter_patent_views(xml_content):
+                        if sampling is sample_all or sampling(
+                            ("container", str(patent_xml, "utf-8"))
+                        ):
+                            self.cached_data.append(patent_xml)
+            self.cached_data.finish()
+        self.cached_path = zip_path
+        self.cached_sampling = sampling
+        self.cached_status = (status.st_mtime_ns, status.st_size)
+        UsptoZipCache.file_reads += 1
         return self.cached_data
 
+    def clear(self):
+        """Discard the cached data and any pending extractions."""
+        self.prefetch([])
+        self.cached_path = None
+        self.cached_sampling = None
+        self.cached_status = None
+        self.cached_data = []
+
+    def revalidate(self, zip_path):
+        """Discard the cached data if they were read from the specified
+        Zip file and it has since been modified.  This is called once
+        for each iteration over a file, rather than on every read.
+
+        :param zip_path: Path to the Zip file.
+        """
+        if zip_path != self.cached_path:
+            return
+        status = os.stat(zip_path)
+        if (status.st_mtime_ns, status.st_size) != self.cached_status:
+            self.clear()
+
 
-# Default
-file_cache = UsptoZipCache()
+# Default caches, one for each thread
+thread_data = threading.local()
 
 
 def get_zip_cache():
-    """Return the file cache used"""
-    return file_cache
+    """Return the file cache used by the calling thread"""
+    try:
+        return thread_data.file_cache
+    except AttributeError:
+        thread_data.file_cache = UsptoZipCache()
+        return thread_data.file_cache
@@ -18,11 +18,106 @@
 #
 """XML helper functions"""
 
+import re
+import sys
+
 # In all cases the variable tree represents an object of the
 # module xml.etree.ElementTree used for parsing and
 # creating XML data. For more information check:
 # https://docs.python.org/3/library/xml.etree.elementtree.html
 
+# A path step that can be resolved without the ElementPath parser:
+# a plain child tag or any child element.
+_SIMPLE_STEP = re.compile(r"[\w-]+|\*")
+
+
+def compile_path(path):
+    """Return a tuple with the steps of the specified path of child
+    elements, or None if the path requires the full ElementPath syntax."""
+    if path.endswith("/"):
+        # ElementPath treats a trailing slash as selecting all children.
+        path += "*"
+    # Parsed element tags are interned, so interned steps compare equal
+    # through object identity.
+    steps = tuple(sys.intern(step) for step in path.split("/"))
+    if all(_SIMPLE_STEP.fullmatch(step) for step in steps):
+        return steps
+    return None
+
+
+def _children(element, step):
+    """Return the children of element matching the specified path step."""
+    if step == "*":
+        return list(element)
+    return element.findall(step)
+
+
+def _first_finder(steps):
+    """Return a function to return the first element below a given
+    element matching the specified path steps, or None.  Each step is
+    bound into its own nested function, so that a lookup involves no
+    interpretation of the steps."""
+    step = steps[0]
+    if len(steps) == 1:
+        if step == "*":
+            return lambda element: element[0] if len(element) else None
+        return lambda element: element.find(step)
+
+    find_rest = _first_finder(steps[1:])
+    if step == "*":
+
+        def find_first_any(element):
+            for child in element:
+                found = find_rest(child)
+                if found is not None:
+                    return found
+            return None
+
+        return find_first_any
+
+    def find_first(element):
+        for child in element.findall(step):
+            found = find_rest(child)
+            if found is not None:
+                return found
+        return None
+
+    return find_first
+
+
+def element_finder(path):
+    """Return a function to return the first element with the specified
+    path from a given tree.  Plain paths are compiled once into functions
+    matching their steps through the native single tag lookups, avoiding
+    the parsing and interpretation of the path on each call."""
+    steps = compile_path(path)
+    if steps is None:
+        return lambda tree: tree.find(path)
+    if len(steps) == 1 and steps[0] != "*":
+        return lambda tree: tree.find(path)
+    return _first_finder(steps)
+
+
+def elements_finder(path):
+    """Return a function to return all elements with the specified
+    path from a given tree, compiling plain paths into their steps."""
+    steps = compile_path(path)
+    if steps is None:
+        return lambda tree: tree.findall(path)
+
+    def find_all(tree):
+        elements = [tree]
+        for step in steps:
+            matches = []
+            for element in elements:
+                matches.extend(_children(element, step))
+            if not matches:
+                return matches
+            elements = matches
+        return elements
+
+    return find_all
+
 
 def get_element(tree, path):
     """Return the text value of the specified element path of the given
@@ -47,15 +142,32 @@ def get_attribute(tree, attr, path=None):
 def getter(path):
     """Return a function to return an element with the specified
     path from a given tree."""
-    return lambda tree: get_element(tree, path)
+    find = element_finder(path)
+
+    def get(tree):
+        element = find(tree)
+        if element is None:
+            return None
+        return element.text
+
+    return get
 
 
 def agetter(attr_name, path=None):
     """Return a function to return an attribute with the specified
     name."""
-    return lambda tree: get_attribute(tree, attr_name, path)
+    attr_name = sys.intern(attr_name)
+    if not path:
+        return lambda tree: tree.get(attr_name)
+    find = element_finder(path)
+
+    def get(tree):
+        element = find(tree)
+        return element.get(attr_name) if element is not None else None
+
+    return get
 
 
 def all_getter(path):
     """Return all elements from the specified path"""
-    return lambda tree: tree.findall(path)
+    return elements_finder(path)
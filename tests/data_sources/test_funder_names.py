@@ -35,6 +35,7 @@ from alexandria3k.common import ensure_unlinked, query_result
 from alexandria3k.data_sources import funder_names
 
 DATABASE_PATH = td("tmp/funder_names.db")
+BLANK_LINES_PATH = td("tmp/funder_names_blank.csv")
 ATTACHED_DATABASE_PATH = td("tmp/attached.db")
 
 
@@ -235,3 +236,29 @@ class TestFunderNamesQuery(unittest.TestCase):
             ),
             1,
         )
+
+
+class TestFunderNamesBlankLines(PopulateQueries):
+    """Verify that blank lines do not end the reading of CSV data"""
+
+    @classmethod
+    def setUpClass(cls):
+        ensure_unlinked(DATABASE_PATH)
+        with open(td("data/funderNames.csv"), encoding="utf-8") as source:
+            lines = source.readlines()
+        with open(BLANK_LINES_PATH, "w", encoding="utf-8") as blank:
+            blank.writelines(lines[:3] + ["\n"] + lines[3:] + ["\n"])
+
+        cls.funder_names = funder_names.FunderNames(BLANK_LINES_PATH)
+        cls.funder_names.populate(DATABASE_PATH)
+        cls.con = sqlite3.connect(DATABASE_PATH)
+        cls.cursor = cls.con.cursor()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.con.close()
+        os.unlink(DATABASE_PATH)
+        os.unlink(BLANK_LINES_PATH)
+
+    def test_counts(self):
+        self.assertEqual(self.record_count("funder_names"), 11)
@@ -29,7 +29,7 @@ add_src_dir()
 from ..common import PopulateQueries, record_count
 from alexandria3k.common import ensure_unlinked
 from alexandria3k.data_sources import uspto
-from alexandria3k.file_xml_cache import FileCache
+from alexandria3k.file_xml_cache import FileCache, get_file_cache
 from alexandria3k.uspto_zip_cache import UsptoZipCache
 from alexandria3k import debug
 
@@ -144,7 +144,8 @@ class TestUsptoPopulateMasterCondition(PopulateQueries):
     def test_counts(self):
         self.assertEqual(self.record_count("us_patents"), 1)
         self.assertEqual(self.record_count("usp_icpr_classifications"), 2)
-        self.assertEqual(FileCache.parse_counter, 14)
+        # Patents of other types are skipped through their file name
+        self.assertEqual(FileCache.parse_counter, 1)
 
 
 class TestUsptoPopulateDetailCondition(PopulateQueries):
@@ -272,7 +273,8 @@ class TestUsptoPopulateDetailConditionColumn(PopulateQueries):
     def test_counts(self):
         self.assertEqual(self.record_count("us_patents"), 3)
         self.assertEqual(self.record_count("usp_icpr_classifications"), 13)
-        self.assertEqual(FileCache.parse_counter, 14)
+        # Only the reissue patents are parsed
+        self.assertEqual(FileCache.parse_counter, 3)
 
     def test_no_extra_fields(self):
         with self.assertRaises(sqlite3.OperationalError):
@@ -430,6 +432,16 @@ class TestUsptoQuery(unittest.TestCase):
         FileCache.parse_counter = 0
         UsptoZipCache.file_reads = 0
 
+    def test_usp_cpc_classification_types(self):
+        types = set(
+            self.uspto.query(
+                "SELECT DISTINCT type FROM usp_cpc_classifications"
+            )
+        )
+        self.assertEqual(types, {("main-cpc",), ("further-cpc",)})
+        FileCache.parse_counter = 0
+        UsptoZipCache.file_reads = 0
+
     def test_usp_related_documents(self):
         for partition in True, False:
             self.assertEqual(
@@ -502,6 +514,17 @@ class TestUsptoQuery(unittest.TestCase):
         FileCache.parse_counter = 0
         UsptoZipCache.file_reads = 0
 
+    def test_usp_assignees_columns(self):
+        (result,) = self.uspto.query(
+            """SELECT name, org_name, role, city, state, country
+            FROM usp_assignees WHERE org_name = 'NIKE, Inc.'"""
+        )
+        self.assertEqual(
+            result, (None, "NIKE, Inc.", "02", "Beaverton", "OR", "US")
+        )
+        FileCache.parse_counter = 0
+        UsptoZipCache.file_reads = 0
+
     def test_usp_citations(self):
         for partition in True, False:
             self.assertEqual(
@@ -629,3 +652,72 @@ class TestUsptoSamplingContainer(PopulateQueries):
         self.assertEqual(count, 1)
         self.assertEqual(UsptoZipCache.file_reads, 2)
         UsptoZipCache.file_reads = 0
+
+
+class TestUsptoOmittedElements(unittest.TestCase):
+    """Verify the skipping of elements of tables not accessed"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.uspto = uspto.Uspto(td("data/uspto-2023-04"))
+
+    @classmethod
+    def tearDownClass(cls):
+        get_file_cache(uspto.RETAINED_ELEMENTS).clear()
+        del cls.uspto
+
+    def test_omitted_elements(self):
+        """Verify that elements skipped for a table are parsed once
+        cursors on the tables accessing them are opened."""
+        data_files = self.uspto.data_source.data_files
+        data_files.omitted_elements = frozenset(uspto.OPTIONAL_ELEMENTS)
+        table = self.uspto.data_source.table_dict["usp_inventors"]
+        # Bypass the query's table name detection.
+        statement = f"SELECT count(*) FROM {table.get_name()}"
+        (result,) = self.uspto.vdb.execute(statement).fetchone()
+        self.assertEqual(result, 33)
+        self.assertNotIn("us-parties", data_files.omitted_elements)
+        self.assertIn("us-references-cited", data_files.omitted_elements)
+        FileCache.parse_counter = 0
+        UsptoZipCache.file_reads = 0
+
+
+class TestUsptoFileNamePattern(unittest.TestCase):
+    def test_type_conditions(self):
+        pattern = uspto.file_name_pattern("us_patents.type = 'plant'")
+        excluded = lambda chunk: uspto.excluded_by_file_name(pattern, chunk)
+        self.assertFalse(
+            excluded(b'<us-patent-grant lang="EN" file="USPP034694">')
+        )
+        self.assertTrue(
+            excluded(b'<us-patent-grant lang="EN" file="USD0967598">')
+        )
+        pattern = uspto.file_name_pattern(" TYPE='utility' ")
+        self.assertFalse(excluded(b'<us-patent-grant file="US11477944">'))
+        self.assertTrue(excluded(b'<us-patent-grant file="USRE049257">'))
+
+    def test_root_tag_not_found(self):
+        """Verify that patents whose root start tag is not found near
+        the start of their chunk are not excluded."""
+        pattern = uspto.file_name_pattern("type = 'plant'")
+        doctype = b"<!DOCTYPE us-patent-grant [" + b" " * 2048 + b"]>"
+        self.assertFalse(
+            uspto.excluded_by_file_name(
+                pattern, doctype + b'<us-patent-grant file="USPP034694">'
+            )
+        )
+        self.assertFalse(
+            uspto.excluded_by_file_name(
+                pattern, doctype + b'<us-patent-grant file="USD0967598">'
+            )
+        )
+
+    def test_other_conditions(self):
+        self.assertIsNone(uspto.file_name_pattern(None))
+        self.assertIsNone(uspto.file_name_pattern("type = 'unknown'"))
+        self.assertIsNone(
+            uspto.file_name_pattern("type = 'plant' OR type = 'design'")
+        )
+        self.assertIsNone(
+            uspto.file_name_pattern("usp_cpc_classifications.type = 'plant'")
+        )
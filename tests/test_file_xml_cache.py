@@ -18,6 +18,7 @@
 #
 """Test of caching read and parsed XML files"""
 
+import threading
 import unittest
 from xml.etree import ElementTree as ET
 
@@ -25,7 +26,7 @@ from .test_dir import add_src_dir
 
 add_src_dir()
 
-from alexandria3k.file_xml_cache import FileCache
+from alexandria3k.file_xml_cache import FileCache, get_file_cache
 
 
 class TestFileCache(unittest.TestCase):
@@ -115,3 +116,111 @@ class TestFileCache(unittest.TestCase):
         self.assertEqual(self.file_cache.parse_counter, 1)
 
         self.file_cache.parse_counter = 0
+
+    def test_retained_elements(self):
+        file_cache = FileCache(frozenset(["title"]))
+        xml_chunk = b"<patent><title>T</title><abstract>A</abstract></patent>"
+
+        result = file_cache.read(xml_chunk, 1)
+
+        self.assertEqual(
+            ET.tostring(result, encoding="unicode"),
+            "<patent><title>T</title></patent>",
+        )
+        FileCache.parse_counter = 0
+
+    def test_trailing_elements_not_parsed(self):
+        file_cache = FileCache(frozenset(["title"]))
+        # The unclosed abstract would fail a complete parse.
+        xml_chunk = b"<patent lang='EN'><title>T</title><abstract></patent>"
+
+        result = file_cache.read(xml_chunk, 1)
+
+        self.assertEqual(
+            ET.tostring(result, encoding="unicode"),
+            '<patent lang="EN"><title>T</title></patent>',
+        )
+        FileCache.parse_counter = 0
+
+    def test_nested_retained_tag(self):
+        file_cache = FileCache(frozenset(["title"]))
+        xml_chunk = (
+            b"<patent><title>T</title><abstract><title>A</title></abstract>"
+            b"</patent>"
+        )
+
+        result = file_cache.read(xml_chunk, 1)
+
+        self.assertEqual(
+            ET.tostring(result, encoding="unicode"),
+            "<patent><title>T</title></patent>",
+        )
+        FileCache.parse_counter = 0
+
+    def test_clear(self):
+        file_cache = FileCache()
+        FileCache.parse_counter = 0
+        file_cache.read(b"<patent/>", 1)
+        file_cache.clear()
+        file_cache.read(b"<patent/>", 1)
+        self.assertEqual(FileCache.parse_counter, 2)
+        FileCache.parse_counter = 0
+
+    def test_omitted_elements(self):
+        file_cache = FileCache(frozenset(["data"]))
+        xml_chunk = (
+            b"<patent><data><title>T</title><refs><ref>R</ref></refs>"
+            b"<claims>2</claims></data><abstract>A</abstract></patent>"
+        )
+        FileCache.parse_counter = 0
+
+        result = file_cache.read(xml_chunk, 1, frozenset(["refs"]))
+        self.assertEqual(
+            ET.tostring(result, encoding="unicode"),
+            "<patent><data><title>T</title><claims>2</claims></data>"
+            "</patent>",
+        )
+
+        # A tree lacking fewer elements can be reused.
+        file_cache.read(xml_chunk, 2, frozenset())
+        file_cache.read(xml_chunk, 2, frozenset(["refs"]))
+        self.assertEqual(FileCache.parse_counter, 2)
+
+        # A tree lacking required elements is parsed again.
+        result = file_cache.read(xml_chunk, 1, frozenset())
+        self.assertEqual(result.find("data/refs/ref").text, "R")
+        self.assertEqual(FileCache.parse_counter, 3)
+        FileCache.parse_counter = 0
+
+    def test_per_thread_cache(self):
+        caches = []
+        thread = threading.Thread(
+            target=lambda: caches.append(get_file_cache())
+        )
+        thread.start()
+        thread.join()
+
+        self.assertIs(get_file_cache(), get_file_cache())
+        self.assertIsNot(caches[0], get_file_cache())
+        retained = frozenset(["title"])
+        self.assertIs(get_file_cache(retained), get_file_cache(retained))
+        self.assertIsNot(get_file_cache(retained), get_file_cache())
+
+    def test_interleaved_reads(self):
+        file_cache = FileCache(size=2)
+        FileCache.parse_counter = 0
+        chunks = [f"<patent><title>{i}</title></patent>" for i in range(3)]
+
+        # Alternating between two files parses each only once
+        for i in [0, 1, 0, 1, 0]:
+            result = file_cache.read(chunks[i], i)
+            self.assertEqual(result.find("title").text, str(i))
+        self.assertEqual(FileCache.parse_counter, 2)
+
+        # Reading a third file evicts the least recently used one
+        file_cache.read(chunks[2], 2)
+        file_cache.read(chunks[0], 0)
+        self.assertEqual(FileCache.parse_counter, 3)
+        file_cache.read(chunks[1], 1)
+        self.assertEqual(FileCache.parse_counter, 4)
+        FileCache.parse_counter = 0
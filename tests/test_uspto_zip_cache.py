@@ -18,13 +18,22 @@
 #
 """Test of decompressing/extracting Zip files of US patent office"""
 
+import io
+import os
 import unittest
 
 from .test_dir import add_src_dir, td
 
 add_src_dir()
 
-from alexandria3k.uspto_zip_cache import UsptoZipCache
+from alexandria3k.uspto_zip_cache import (
+    XML_DELIMITER,
+    UsptoZipCache,
+    get_zip_cache,
+    prefetch_enabled,
+    prefetching,
+    iter_patent_views,
+)
 
 FILE_PATH_1 = td(
     "data/uspto-2023-04/2022/ipgb20221025_wk43.zip"
@@ -68,6 +77,45 @@ class TestUsptoNewRead(unittest.TestCase):
         self.assertNotEqual(data_2, data_2_cached)
 
 
+class TestUsptoCacheKey(unittest.TestCase):
+    def test_reread_conditions(self):
+        """Verify that the cached data are only reused for the same
+        file contents and sampling."""
+        file_cache = UsptoZipCache()
+        UsptoZipCache.file_reads = 0
+        sample_all = lambda data: True
+        data = file_cache.read(FILE_PATH_2, sample_all)
+        self.assertIs(file_cache.read(FILE_PATH_2, sample_all), data)
+        self.assertEqual(UsptoZipCache.file_reads, 1)
+
+        sampled = file_cache.read(FILE_PATH_2, lambda data: False)
+        self.assertEqual(len(sampled), 0)
+        self.assertEqual(UsptoZipCache.file_reads, 2)
+
+        # A modified file is read again once revalidated.
+        sample_none = lambda data: False
+        file_cache.read(FILE_PATH_2, sample_none)
+        self.assertEqual(UsptoZipCache.file_reads, 3)
+        status = os.stat(FILE_PATH_2)
+        os.utime(
+            FILE_PATH_2, ns=(status.st_atime_ns, status.st_mtime_ns + 1)
+        )
+        try:
+            file_cache.read(FILE_PATH_2, sample_none)
+            self.assertEqual(UsptoZipCache.file_reads, 3)
+            file_cache.revalidate(FILE_PATH_2)
+            file_cache.read(FILE_PATH_2, sample_none)
+        finally:
+            os.utime(
+                FILE_PATH_2, ns=(status.st_atime_ns, status.st_mtime_ns)
+            )
+        self.assertEqual(UsptoZipCache.file_reads, 4)
+
+        file_cache.clear()
+        file_cache.read(FILE_PATH_2, sample_none)
+        self.assertEqual(UsptoZipCache.file_reads, 5)
+
+
 class TestUsptoExtraction(unittest.TestCase):
     @classmethod
     def setUpClass(self):
@@ -82,8 +130,82 @@ class TestUsptoExtraction(unittest.TestCase):
         extracted_data_1 = self.file_cache.read(FILE_PATH_1)
         self.assertEqual(UsptoZipCache.file_reads, 1)
         self.assertEqual(len(extracted_data_1), 11)
+        self.assertTrue(
+            bytes(extracted_data_1[10]).startswith(b"\n<!DOCTYPE us-patent")
+        )
+        with self.assertRaises(IndexError):
+            extracted_data_1[11]
 
         # Read the second zip file
         extracted_data_2 = self.file_cache.read(FILE_PATH_2)
         self.assertEqual(UsptoZipCache.file_reads, 2)
         self.assertEqual(len(extracted_data_2), 3)
+
+
+@unittest.skipUnless(prefetch_enabled(), "no fork start method")
+class TestUsptoPrefetch(unittest.TestCase):
+    def test_prefetched_data(self):
+        """Verify that Zip files extracted in the background have the
+        same contents as those read directly."""
+        direct = [bytes(p) for p in UsptoZipCache().read(FILE_PATH_1)]
+        file_cache = UsptoZipCache()
+        with prefetching():
+            file_cache.prefetch([FILE_PATH_1, FILE_PATH_2])
+            scratch_paths = [
+                future.result()[1] for future in file_cache.pending.values()
+            ]
+            prefetched = [bytes(p) for p in file_cache.read(FILE_PATH_1)]
+            self.assertEqual(prefetched, direct)
+            self.assertEqual(list(file_cache.pending), [FILE_PATH_2])
+
+            sampled = file_cache.read(
+                FILE_PATH_2, lambda data: "USD" not in data[1]
+            )
+            self.assertLess(len(sampled), 3)
+            self.assertEqual(file_cache.pending, {})
+
+        # Scratch files are removed once mapped.
+        for path in scratch_paths:
+            self.assertFalse(os.path.exists(path))
+
+    def test_prefetching_ended(self):
+        """Verify that the calling thread's pending extractions are
+        discarded when prefetching ends, that those of other caches are
+        then read directly, and that nothing is prefetched outside it."""
+        direct = [bytes(p) for p in UsptoZipCache().read(FILE_PATH_1)]
+        other_cache = UsptoZipCache()
+        with prefetching():
+            get_zip_cache().prefetch([FILE_PATH_2])
+            other_cache.prefetch([FILE_PATH_1])
+        self.assertEqual(get_zip_cache().pending, {})
+        prefetched = [bytes(p) for p in other_cache.read(FILE_PATH_1)]
+        self.assertEqual(prefetched, direct)
+
+        get_zip_cache().prefetch([FILE_PATH_2])
+        self.assertEqual(get_zip_cache().pending, {})
+
+
+class TestIterPatents(unittest.TestCase):
+    def test_block_boundaries(self):
+        """Verify that patents are split correctly even when the
+        delimiter straddles the read blocks."""
+        patents = ["<a>1</a>", "<b>22</b>", "", "<c>333</c>"]
+        content = "".join([XML_DELIMITER + p for p in patents]).encode()
+        for block_size in [1, 3, 7, 64, 1024]:
+            views = iter_patent_views(io.BytesIO(content), block_size)
+            result = [bytes(p) for p in views]
+            self.assertEqual(result, [p.encode() for p in patents])
+
+    def test_views_released(self):
+        """Verify that each view is released once the next is obtained."""
+        content = (XML_DELIMITER + "<a/>" + XML_DELIMITER + "<b/>").encode()
+        views = iter_patent_views(io.BytesIO(content), 3)
+        first = next(views)
+        self.assertEqual(first, b"<a/>")
+        self.assertEqual(next(views), b"<b/>")
+        with self.assertRaises(ValueError):
+            bytes(first)
+
+    def test_no_delimiter(self):
+        views = iter_patent_views(io.BytesIO(b"<a/>"))
+        self.assertEqual([bytes(p) for p in views], [])
@@ -116,5 +116,32 @@ class TestXMLFunctions(unittest.TestCase):
         self.assertEqual(elements[0].text, "Value1")
 
 
+class TestCompiledPaths(unittest.TestCase):
+    def setUp(self):
+        self.tree = ET.fromstring(
+            "<r><a><b>1</b></a><a><c>2</c><c>3</c></a><a><c>4</c></a></r>"
+        )
+
+    def test_compile_path(self):
+        self.assertEqual(compile_path("a/b-c/d_e"), ("a", "b-c", "d_e"))
+        self.assertEqual(compile_path("a/"), ("a", "*"))
+        self.assertIsNone(compile_path("a//b"))
+        self.assertIsNone(compile_path("a[@x='1']"))
+
+    def test_element_finder(self):
+        """Verify that later siblings of intermediate elements are
+        searched, as in ElementTree's find."""
+        self.assertEqual(element_finder("a/c")(self.tree).text, "2")
+        self.assertEqual(element_finder("a/*")(self.tree).text, "1")
+        self.assertEqual(element_finder("*/c")(self.tree).text, "2")
+        self.assertIsNone(element_finder("a/d")(self.tree))
+
+    def test_elements_finder(self):
+        for path in ["a/c", "a/b", "a/*", "a/", "*/c", "a/d", "a"]:
+            self.assertEqual(
+                elements_finder(path)(self.tree), self.tree.findall(path)
+            )
+
+
 if __name__ == "__main__":
     unittest.main()